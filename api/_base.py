@@ -0,0 +1,151 @@
+"""
+Base común para los handlers serverless de api/
+
+Centraliza las cabeceras CORS, la serialización JSON y la escritura de la
+respuesta: el cuerpo se serializa una sola vez a bytes, se comprime con
+gzip/brotli según Accept-Encoding cuando merece la pena y se envía con
+Content-Length para que la conexión pueda reutilizarse (keep-alive).
+"""
+
+from http.server import BaseHTTPRequestHandler
+import gzip
+import hashlib
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Por debajo de este tamaño la compresión no compensa su coste
+COMPRESSION_THRESHOLD = 1024
+
+def dumps(data):
+    """Serializa a JSON compacto en UTF-8, usando orjson si está disponible"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def compress(body, encoding):
+    """Comprime el cuerpo con la codificación negociada ('br', 'gzip' o None)"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=5)
+    return body
+
+class StaticPayload:
+    """
+    Respuesta JSON constante, serializada una vez al importar el módulo
+
+    Guarda el ETag y las variantes comprimidas para que las peticiones
+    repetidas no vuelvan a serializar ni a comprimir nada.
+    """
+
+    def __init__(self, data):
+        self.body = dumps(data)
+        self.digest = hashlib.sha1(self.body).hexdigest()
+        self._variants = {None: self.body}
+
+    def etag(self, encoding=None):
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    def encoded(self, encoding):
+        if encoding not in self._variants:
+            self._variants[encoding] = compress(self.body, encoding)
+        return self._variants[encoding]
+
+    def matches(self, if_none_match):
+        """Indica si la cabecera If-None-Match corresponde a alguna variante"""
+        if not if_none_match:
+            return False
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            if tag == '*':
+                return True
+            if tag.startswith('W/'):
+                tag = tag[2:]
+            if tag.strip('"').split('-')[0] == self.digest:
+                return True
+        return False
+
+class JSONHandler(BaseHTTPRequestHandler):
+    """Handler base con CORS, respuestas JSON comprimidas y ETag"""
+
+    protocol_version = 'HTTP/1.1'
+    allowed_methods = 'POST, OPTIONS'
+
+    def do_OPTIONS(self):
+        self.send_response(200)
+        self._send_cors_headers()
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _send_cors_headers(self):
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', self.allowed_methods)
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+
+    def _send_success_response(self, data):
+        self._send_json(200, dumps(data))
+
+    def _send_error_response(self, status_code, message):
+        # Tras un error puede quedar cuerpo sin leer, así que se cierra la conexión
+        self._send_json(status_code, dumps({"error": message}), close=True)
+
+    def _send_static_response(self, payload):
+        """Envía un StaticPayload, respondiendo 304 si el cliente ya lo tiene"""
+        # El 304 lleva el ETag de la misma variante que devolvería el 200
+        encoding = self._negotiate_encoding(len(payload.body))
+        if payload.matches(self.headers.get('If-None-Match')):
+            self.send_response(304)
+            self._send_cors_headers()
+            self.send_header('ETag', payload.etag(encoding))
+            self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return
+
+        self._write_body(200, payload.encoded(encoding), encoding, etag=payload.etag(encoding))
+
+    def _send_json(self, status_code, body, close=False):
+        encoding = self._negotiate_encoding(len(body))
+        self._write_body(status_code, compress(body, encoding), encoding, close=close)
+
+    def _negotiate_encoding(self, size):
+        """Elige 'br' o 'gzip' según Accept-Encoding, o None si no compensa"""
+        if size < COMPRESSION_THRESHOLD:
+            return None
+
+        accepted = set()
+        for item in self.headers.get('Accept-Encoding', '').split(','):
+            name, _, params = item.strip().partition(';')
+            if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+                continue
+            accepted.add(name.strip().lower())
+
+        if brotli is not None and 'br' in accepted:
+            return 'br'
+        if 'gzip' in accepted or '*' in accepted:
+            return 'gzip'
+        return None
+
+    def _write_body(self, status_code, body, encoding=None, etag=None, close=False):
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self._send_cors_headers()
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        if encoding or etag:
+            self.send_header('Vary', 'Accept-Encoding')
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        if close:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
@@ -0,0 +1,142 @@
+"""
+Registro de plantillas de prompt para la generación de preguntas
+
+Cada plantilla separa las instrucciones, que son constantes, de lo que
+cambia en cada petición: el número de preguntas y el contenido del
+documento van en el mensaje del usuario. Así todas las peticiones con el
+mismo tipo de examen y modelo comparten el mismo prefijo, que el proveedor o
+una caché local pueden reutilizar. La versión de cada plantilla es un hash de su
+texto y parámetros, para que cachés y benchmarks puedan indexar por ella.
+"""
+
+from functools import lru_cache
+import hashlib
+import json
+
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+
+_TEST_INSTRUCTIONS = """Genera preguntas de opción múltiple basadas en el contenido que se proporciona en el siguiente mensaje, junto con el número de preguntas.
+
+INSTRUCCIONES:
+- Crear exactamente el número de preguntas de opción múltiple indicado
+- Cada pregunta debe tener 4 opciones (A, B, C, D)
+- Solo una opción debe ser correcta
+- Las preguntas deben cubrir los puntos más importantes del contenido
+- Indica en "sourcePage" el número de página ("--- Página N ---") del que procede cada pregunta
+
+FORMATO DE RESPUESTA (JSON):
+{
+  "questions": [
+    {
+      "id": 1,
+      "question": "Pregunta aquí",
+      "options": ["A) Opción 1", "B) Opción 2", "C) Opción 3", "D) Opción 4"],
+      "correctAnswer": 0,
+      "explanation": "Explicación de por qué esta es la respuesta correcta",
+      "type": "multiple-choice",
+      "sourcePage": 1
+    }
+  ]
+}
+
+Responde SOLO con el JSON, sin texto adicional."""
+
+_DEVELOPMENT_INSTRUCTIONS = """Genera preguntas de desarrollo basadas en el contenido que se proporciona en el siguiente mensaje, junto con el número de preguntas.
+
+INSTRUCCIONES:
+- Crear exactamente el número de preguntas de desarrollo/ensayo indicado
+- Las preguntas deben requerir análisis, síntesis o explicación detallada
+- Indica en "sourcePage" el número de página ("--- Página N ---") del que procede cada pregunta
+
+FORMATO DE RESPUESTA (JSON):
+{
+  "questions": [
+    {
+      "id": 1,
+      "question": "Pregunta de desarrollo aquí",
+      "correctAnswer": "",
+      "explanation": "Puntos clave o respuesta esperada",
+      "type": "development",
+      "expectedAnswer": "Respuesta esperada detallada",
+      "sourcePage": 1
+    }
+  ]
+}
+
+Responde SOLO con el JSON, sin texto adicional."""
+
+# Parte variable de cada petición, que precede al contenido
+_TEST_REQUEST = "Genera exactamente {num_questions} preguntas de opción múltiple."
+_DEVELOPMENT_REQUEST = "Genera exactamente {num_questions} preguntas de desarrollo."
+
+# Los modelos pequeños tienden a añadir texto alrededor del JSON
+_STRICT_JSON_SUFFIX = """
+No uses bloques de código ni escribas nada antes o después del JSON."""
+
+class PromptTemplate:
+    """
+    Plantilla de prompt para un tipo de examen y un modelo
+
+    Args:
+        exam_type (str): 'test' o 'development'
+        model (str): Modelo para el que está pensada la variante
+        instructions (str): Instrucciones constantes del mensaje de sistema
+        request (str): Petición con el marcador {num_questions}, que se
+            envía antes del contenido
+        temperature (float): Temperatura de la llamada
+        max_tokens (int): Máximo de tokens de la respuesta
+    """
+
+    def __init__(self, exam_type, model, instructions, request, temperature=0.7, max_tokens=4000):
+        self.exam_type = exam_type
+        self.model = model
+        self.instructions = instructions
+        self.request = request
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.version = hashlib.sha256(json.dumps(
+            [exam_type, model, instructions, request, temperature, max_tokens], ensure_ascii=False
+        ).encode("utf-8")).hexdigest()[:12]
+
+    def messages(self, num_questions, content):
+        """
+        Mensajes de la petición: el de sistema es idéntico en todas las
+        peticiones de la plantilla y el número de preguntas y el contenido
+        van en el del usuario
+        """
+        request = self.request.format(num_questions=num_questions)
+        return [
+            {"role": "system", "content": self.instructions},
+            {"role": "user", "content": f"{request}\n\nCONTENIDO:\n{content}"}
+        ]
+
+TEMPLATES = {}
+
+def register(template):
+    """Registra una plantilla para su tipo de examen y modelo"""
+    TEMPLATES[(template.exam_type, template.model)] = template
+    return template
+
+def get_template(exam_type, model=DEFAULT_MODEL):
+    """
+    Devuelve la variante del modelo indicado, o una copia de la del modelo
+    por defecto si no hay una específica. Cualquier tipo distinto de 'test'
+    es desarrollo.
+    """
+    exam_type = "test" if exam_type == "test" else "development"
+    return TEMPLATES.get((exam_type, model)) or _fallback_template(exam_type, model)
+
+@lru_cache(maxsize=32)
+def _fallback_template(exam_type, model):
+    # La copia lleva el modelo real, así su versión no coincide con la de
+    # otro modelo y una caché indexada por versión no mezcla sus respuestas
+    default = TEMPLATES[(exam_type, DEFAULT_MODEL)]
+    return PromptTemplate(exam_type, model, default.instructions, default.request,
+                          default.temperature, default.max_tokens)
+
+register(PromptTemplate("test", DEFAULT_MODEL, _TEST_INSTRUCTIONS, _TEST_REQUEST))
+register(PromptTemplate("development", DEFAULT_MODEL, _DEVELOPMENT_INSTRUCTIONS, _DEVELOPMENT_REQUEST))
+register(PromptTemplate("test", "llama-3.1-8b-instant", _TEST_INSTRUCTIONS + _STRICT_JSON_SUFFIX,
+                        _TEST_REQUEST, temperature=0.5))
+register(PromptTemplate("development", "llama-3.1-8b-instant", _DEVELOPMENT_INSTRUCTIONS + _STRICT_JSON_SUFFIX,
+                        _DEVELOPMENT_REQUEST, temperature=0.5))
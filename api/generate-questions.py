@@ -1,19 +1,96 @@
-from http.server import BaseHTTPRequestHandler
 import json
 import os
+import sys
 import tempfile
 import io
 from groq import Groq
 from urllib.parse import parse_qs
 import cgi
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
-class handler(BaseHTTPRequestHandler):
+# _base vive junto a los handlers y pdf_extractor en la raíz del proyecto
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _base import JSONHandler
+import _prompts
+import document_store
+try:
+    import pdf_extractor
+except ImportError:
+    pdf_extractor = None
+
+DEFAULT_NUM_QUESTIONS = {'test': 20, 'development': 5}
+GROQ_MODEL = os.getenv("GROQ_MODEL", _prompts.DEFAULT_MODEL)
+
+# Pool de procesos para extraer varios PDFs, compartido por todas las
+# peticiones del worker. Se crea con forkserver/spawn porque hacer fork de un
+# servidor con hilos puede copiar locks que otro hilo tenía tomados. Los
+# procesos hijos vuelven a importar el __main__ del proceso anfitrión: si no
+# es importable (p. ej. no es un fichero) el pool se rompe en cada uso
+_extraction_pool = None
+_extraction_pool_lock = threading.Lock()
+_extraction_pool_available = True
+_extraction_pool_healthy = False
+
+# Veces que se recrea un pool que ya había funcionado antes de pasar a usar
+# solo hilos; un pool que se rompe sin completar ninguna extracción no se recrea
+EXTRACTION_POOL_REBUILDS = 3
+_extraction_pool_rebuilds = 0
+
+def _get_extraction_pool():
+    """Devuelve el pool de extracción, o None si no hay soporte para procesos"""
+    global _extraction_pool, _extraction_pool_available, _extraction_pool_healthy
+    with _extraction_pool_lock:
+        if _extraction_pool is None and _extraction_pool_available:
+            start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            try:
+                _extraction_pool = ProcessPoolExecutor(
+                    max_workers=os.cpu_count() or 1,
+                    mp_context=multiprocessing.get_context(start_method)
+                )
+                _extraction_pool_healthy = False
+            except (OSError, NotImplementedError, ImportError) as pool_error:
+                # p. ej. en Lambda no hay /dev/shm para los semáforos
+                print(f"DEBUG: Process pool not available, using threads: {pool_error}")
+                _extraction_pool_available = False
+        return _extraction_pool
+
+def _mark_extraction_pool_healthy(pool):
+    """Anota que el pool ha completado una extracción"""
+    global _extraction_pool_healthy
+    with _extraction_pool_lock:
+        if _extraction_pool is pool:
+            _extraction_pool_healthy = True
+
+def _discard_extraction_pool(pool):
+    """
+    Descarta un pool roto. La siguiente petición crea otro solo si este ya
+    había funcionado y no se ha agotado el número de recreaciones; si no, el
+    fallo se considera permanente y se usan hilos desde entonces.
+    """
+    global _extraction_pool, _extraction_pool_available, _extraction_pool_rebuilds
+    with _extraction_pool_lock:
+        if _extraction_pool is pool:
+            _extraction_pool = None
+            if _extraction_pool_healthy and _extraction_pool_rebuilds < EXTRACTION_POOL_REBUILDS:
+                _extraction_pool_rebuilds += 1
+            else:
+                print("DEBUG: Extraction pool keeps failing, using threads from now on")
+                _extraction_pool_available = False
+    pool.shutdown(wait=False)
+
+class handler(JSONHandler):
     def do_POST(self):
         print(f"DEBUG: GENERATE-QUESTIONS endpoint called. Path: {self.path}")
         print(f"DEBUG: GENERATE-QUESTIONS Headers: {dict(self.headers)}")
         try:
             # Verificar el Content-Type con debugging
             content_type = self.headers.get('Content-Type', '')
+            document_id = None
+            page_start, page_end = 1, None
             
             # Log para debugging
             print(f"DEBUG: Received Content-Type: '{content_type}'")
@@ -32,16 +109,18 @@ class handler(BaseHTTPRequestHandler):
                     self._send_error_response(400, "PDF file is required")
                     return
                 
-                pdf_file = form['pdf']
-                if not pdf_file.filename or not pdf_file.filename.lower().endswith('.pdf'):
+                pdf_files = self._pdf_fields(form)
+                if not all(f.filename and f.filename.lower().endswith('.pdf') for f in pdf_files):
                     self._send_error_response(400, "Only PDF files are allowed")
                     return
                 
-                # Obtener tipo de examen
-                exam_type = form.getvalue('examType', 'test')
+                # Varios PDFs: un único examen a partir de todos ellos
+                if len(pdf_files) > 1:
+                    self._generate_from_documents(form, pdf_files)
+                    return
                 
-                # Extraer texto del PDF
-                content = self._extract_pdf_text(pdf_file.file.read())
+                # Obtener tipo de examen, modo y texto del PDF
+                exam_type, mode, tables, content, pages, previous_pages, previous_questions, previous_document_id = self._read_pdf_form(form)
                 
             else:
                 # Intentar manejar como FormData primero, luego como JSON
@@ -91,10 +170,12 @@ class handler(BaseHTTPRequestHandler):
                     
                     # Si tiene archivo PDF, procesarlo como FormData
                     if 'pdf' in form:
-                        pdf_file = form['pdf']
-                        if pdf_file.filename and pdf_file.filename.lower().endswith('.pdf'):
-                            exam_type = form.getvalue('examType', 'test')
-                            content = self._extract_pdf_text(pdf_file.file.read())
+                        pdf_files = self._pdf_fields(form)
+                        if all(f.filename and f.filename.lower().endswith('.pdf') for f in pdf_files):
+                            if len(pdf_files) > 1:
+                                self._generate_from_documents(form, pdf_files)
+                                return
+                            exam_type, mode, tables, content, pages, previous_pages, previous_questions, previous_document_id = self._read_pdf_form(form)
                         else:
                             raise ValueError("Not a valid PDF FormData")
                     else:
@@ -119,137 +200,85 @@ class handler(BaseHTTPRequestHandler):
                         request_data = json.loads(decoded_data)
                         content = request_data.get('content', '')
                         exam_type = request_data.get('examType', 'test')
+                        mode = request_data.get('mode', 'full')
+                        tables = False
+                        pages = None
+                        previous_pages = request_data.get('previousPages', [])
+                        previous_questions = request_data.get('previousQuestions', [])
+                        previous_document_id = request_data.get('previousDocumentId')
+                        document_id = request_data.get('documentId')
+                        page_start = request_data.get('pageStart', 1)
+                        page_end = request_data.get('pageEnd')
                         
                     except Exception as json_error:
                         self._send_error_response(400, f"Could not parse request as FormData or JSON. Content-Type: '{content_type}'. Error: {str(json_error)}")
                         return
             
-            # Limpiar el contenido de caracteres problemáticos
-            if content:
-                content = content.encode('utf-8', errors='ignore').decode('utf-8')
-                content = ''.join(char for char in content if ord(char) >= 32 or char in '\n\r\t')
-            
-            if not content.strip():
-                self._send_error_response(400, "Content is required")
-                return
-            
-            # Configurar Groq con debugging
-            groq_api_key = os.getenv("GROQ_API_KEY")
-            if not groq_api_key:
-                # Intentar otras variantes de la variable
-                groq_api_key = os.getenv("GROQ_API_KEY") or os.getenv("groq_api_key") or os.getenv("GROQ_KEY")
-                if not groq_api_key:
-                    available_vars = [k for k in os.environ.keys() if 'groq' in k.lower() or 'GROQ' in k]
-                    self._send_error_response(500, f"GROQ_API_KEY not configured. Available Groq vars: {available_vars}")
+            if pages is not None:
+                # Guardar el documento para poder reutilizarlo sin volver a subir el PDF
+                document_id = self._store_document(pages, tables, previous_document_id if mode == 'diff' else None)
+            elif document_id and not content:
+                # Construir el contenido a partir de un documento ya guardado
+                try:
+                    with document_store.DocumentStore().open(document_id) as document:
+                        content = document.page_range(int(page_start), int(page_end) if page_end else None)
+                except (OSError, ValueError, TypeError) as store_error:
+                    self._send_error_response(400, f"Could not read stored document: {str(store_error)}")
                     return
             
-            # Inicializar cliente Groq con manejo de errores
-            try:
-                client = Groq(api_key=groq_api_key)
-            except Exception as groq_init_error:
-                self._send_error_response(500, f"Failed to initialize Groq client: {str(groq_init_error)}")
-                return
+            # Limpiar el contenido de caracteres problemáticos
+            content = self._clean_content(content)
             
-            # Generar prompt
-            if exam_type == 'test':
-                num_questions = 20
-                prompt = f"""
-Genera exactamente {num_questions} preguntas de opción múltiple basadas en el siguiente contenido.
-
-CONTENIDO:
-{content}
-
-INSTRUCCIONES:
-- Crear exactamente {num_questions} preguntas de opción múltiple
-- Cada pregunta debe tener 4 opciones (A, B, C, D)
-- Solo una opción debe ser correcta
-- Las preguntas deben cubrir los puntos más importantes del contenido
-
-FORMATO DE RESPUESTA (JSON):
-{{
-  "questions": [
-    {{
-      "id": 1,
-      "question": "Pregunta aquí",
-      "options": ["A) Opción 1", "B) Opción 2", "C) Opción 3", "D) Opción 4"],
-      "correctAnswer": 0,
-      "explanation": "Explicación de por qué esta es la respuesta correcta",
-      "type": "multiple-choice"
-    }}
-  ]
-}}
-
-Responde SOLO con el JSON, sin texto adicional.
-"""
-            else:  # development
-                num_questions = 5
-                prompt = f"""
-Genera exactamente {num_questions} preguntas de desarrollo basadas en el siguiente contenido.
-
-CONTENIDO:
-{content}
-
-INSTRUCCIONES:
-- Crear exactamente {num_questions} preguntas de desarrollo/ensayo
-- Las preguntas deben requerir análisis, síntesis o explicación detallada
-
-FORMATO DE RESPUESTA (JSON):
-{{
-  "questions": [
-    {{
-      "id": 1,
-      "question": "Pregunta de desarrollo aquí",
-      "correctAnswer": "",
-      "explanation": "Puntos clave o respuesta esperada",
-      "type": "development",
-      "expectedAnswer": "Respuesta esperada detallada"
-    }}
-  ]
-}}
-
-Responde SOLO con el JSON, sin texto adicional.
-"""
+            num_questions = DEFAULT_NUM_QUESTIONS.get(exam_type, DEFAULT_NUM_QUESTIONS['development'])
+            kept_questions = []
             
-            # Llamar a Groq con manejo de errores mejorado
-            try:
-                response = client.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.7,
-                    max_tokens=4000
-                )
+            # Obtener la plantilla: instrucciones estáticas primero, contenido al final
+            template = _prompts.get_template(exam_type, GROQ_MODEL)
+            
+            # Modo diff: conservar las preguntas de páginas sin cambios y
+            # regenerar solo las que procedían de páginas modificadas
+            if mode == 'diff':
+                if pages is None or not previous_pages or not previous_questions:
+                    self._send_error_response(400, "Diff mode requires a PDF, previousPages and previousQuestions")
+                    return
                 
-                response_text = response.choices[0].message.content.strip()
+                kept_questions, dropped_count = self._plan_diff(pages, previous_pages, previous_questions)
+                changed_pages = [p['page'] for p in pages if p['changed']]
                 
-                # Limpiar la respuesta de caracteres problemáticos
-                response_text = response_text.encode('utf-8', errors='ignore').decode('utf-8')
+                if not changed_pages or not content.strip():
+                    response_data = self._merge_diff_response({"questions": []}, kept_questions, pages)
+                    if document_id:
+                        response_data['documentId'] = document_id
+                    response_data['promptVersion'] = template.version
+                    self._send_success_response(response_data)
+                    return
                 
-            except Exception as groq_error:
-                self._send_error_response(500, f"Groq API error: {str(groq_error)}")
+                num_questions = min(max(dropped_count, 1), num_questions)
+            
+            if not content.strip():
+                self._send_error_response(400, "Content is required")
                 return
             
-            # Parsear respuesta JSON con manejo mejorado
-            try:
-                start_idx = response_text.find('{')
-                end_idx = response_text.rfind('}') + 1
-                
-                if start_idx == -1 or end_idx == 0:
-                    raise ValueError("No JSON found in response")
-                    
-                json_text = response_text[start_idx:end_idx]
-                
-                # Limpiar el JSON de caracteres problemáticos
-                json_text = json_text.replace('\x00', '').replace('\ufffd', '')
-                
-                response_data = json.loads(json_text)
-                
-            except json.JSONDecodeError as json_error:
-                self._send_error_response(500, f"Invalid JSON response from AI: {str(json_error)}")
+            client = self._create_groq_client()
+            if client is None:
                 return
-            except Exception as parse_error:
-                self._send_error_response(500, f"Error parsing AI response: {str(parse_error)}")
+            
+            try:
+                response_data = self._request_questions(client, template, num_questions, content)
+            except Exception as generation_error:
+                self._send_error_response(500, str(generation_error))
                 return
             
+            if mode == 'diff':
+                response_data = self._merge_diff_response(response_data, kept_questions, pages)
+            elif pages is not None:
+                # Manifiesto de páginas para poder pedir un diff en la siguiente versión
+                response_data['pages'] = self._page_manifest(pages)
+            
+            if document_id:
+                response_data['documentId'] = document_id
+            response_data['promptVersion'] = template.version
+            
             # Enviar respuesta exitosa
             self._send_success_response(response_data)
             
@@ -260,62 +289,364 @@ Responde SOLO con el JSON, sin texto adicional.
         except Exception as e:
             self._send_error_response(500, f"Error generating questions: {str(e)}")
     
-    def _extract_pdf_text(self, pdf_content):
-        """Extrae texto de un PDF usando una biblioteca simple"""
+    def _read_pdf_form(self, form):
+        """Lee el tipo de examen, el modo y el PDF de un FormData"""
+        exam_type = form.getvalue('examType', 'test')
+        mode = form.getvalue('mode', 'full')
+        tables = str(form.getvalue('tables', '')).lower() in ('1', 'true', 'yes')
+        previous_pages = self._parse_json_field(form.getvalue('previousPages'))
+        previous_questions = self._parse_json_field(form.getvalue('previousQuestions'))
+        previous_document_id = form.getvalue('previousDocumentId')
+        
+        # En modo diff solo se extraen las páginas cuya huella es nueva
+        known_fingerprints = None
+        if mode == 'diff':
+            known_fingerprints = [p['fingerprint'] for p in self._valid_previous_pages(previous_pages)]
+        
+        content, pages = self._extract_pdf_text(form['pdf'].file.read(), known_fingerprints, tables)
+        return exam_type, mode, tables, content, pages, previous_pages, previous_questions, previous_document_id
+    
+    def _pdf_fields(self, form):
+        """Devuelve los campos 'pdf' del FormData como lista"""
+        fields = form['pdf']
+        return fields if isinstance(fields, list) else [fields]
+    
+    def _parse_json_field(self, value):
+        """Decodifica un campo JSON de FormData, devolviendo [] si no es válido"""
+        if not value:
+            return []
+        try:
+            parsed = json.loads(value)
+        except (TypeError, ValueError):
+            return []
+        return parsed if isinstance(parsed, list) else []
+    
+    def _extract_pdf_text(self, pdf_content, known_fingerprints=None, tables=False):
+        """Extrae texto de un PDF página a página, saltando las páginas conocidas"""
         try:
             # Intentar usar pdfplumber si está disponible
+            if pdf_extractor is None:
+                # Fallback: si no hay pdfplumber, intentar una extracción básica
+                return "PDF content extraction not available in this environment. Please provide text content directly.", None
+            
+            # Crear archivo temporal
+            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
+                temp_file.write(pdf_content)
+                temp_file_path = temp_file.name
+            
+            # Extraer texto
             try:
-                import pdfplumber
-                
-                # Crear archivo temporal
-                with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-                    temp_file.write(pdf_content)
-                    temp_file_path = temp_file.name
-                
-                # Extraer texto
-                text_content = ""
-                with pdfplumber.open(temp_file_path) as pdf:
-                    for page in pdf.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text_content += page_text + "\n"
-                
+                pages = pdf_extractor.extract_pages(temp_file_path, known_fingerprints, tables)
+            finally:
                 # Limpiar archivo temporal
                 try:
                     os.unlink(temp_file_path)
                 except:
                     pass
+            
+            return pdf_extractor.join_pages(pages), pages
                 
-                return text_content.strip()
+        except Exception as e:
+            raise Exception(f"PDF extraction failed: {str(e)}")
+    
+    def _store_document(self, pages, tables=False, previous_document_id=None):
+        """
+        Guarda las páginas extraídas en el DocumentStore y devuelve el id del
+        documento, o None si no se ha podido guardar. En modo diff el texto y
+        el número de tablas de las páginas sin cambios se toman de la versión
+        anterior (previousDocumentId) si sigue guardada y se extrajo en el
+        mismo modo; las páginas se completan en el propio manifiesto.
+        """
+        store = document_store.DocumentStore()
+        try:
+            if any(p['text'] is None for p in pages):
+                if previous_document_id not in store:
+                    return None
                 
-            except ImportError:
-                # Fallback: si no hay pdfplumber, intentar una extracción básica
-                return "PDF content extraction not available in this environment. Please provide text content directly."
+                with store.open(previous_document_id) as previous:
+                    # El texto de otro modo de extracción no es intercambiable
+                    if previous.tables != tables:
+                        return None
+                    previous_page_by_fingerprint = {
+                        previous.fingerprint(n): n for n in range(1, previous.page_count + 1)
+                    }
+                    for p in pages:
+                        if p['text'] is None:
+                            previous_page = previous_page_by_fingerprint[p['fingerprint']]
+                            p['text'] = previous.page_text(previous_page)
+                            p['tables'] = previous.page_tables(previous_page)
+            
+            return store.put(pages, tables)
+        except (OSError, ValueError, KeyError) as store_error:
+            print(f"DEBUG: Could not store document: {store_error}")
+            return None
+    
+    def _clean_content(self, content):
+        """Elimina del contenido los caracteres problemáticos"""
+        if not content:
+            return content
+        content = content.encode('utf-8', errors='ignore').decode('utf-8')
+        return ''.join(char for char in content if ord(char) >= 32 or char in '\n\r\t')
+    
+    def _create_groq_client(self):
+        """Crea el cliente de Groq; si no es posible envía el error y devuelve None"""
+        # Configurar Groq con debugging
+        groq_api_key = os.getenv("GROQ_API_KEY")
+        if not groq_api_key:
+            # Intentar otras variantes de la variable
+            groq_api_key = os.getenv("GROQ_API_KEY") or os.getenv("groq_api_key") or os.getenv("GROQ_KEY")
+            if not groq_api_key:
+                available_vars = [k for k in os.environ.keys() if 'groq' in k.lower() or 'GROQ' in k]
+                self._send_error_response(500, f"GROQ_API_KEY not configured. Available Groq vars: {available_vars}")
+                return None
+        
+        # Inicializar cliente Groq con manejo de errores
+        try:
+            return Groq(api_key=groq_api_key)
+        except Exception as groq_init_error:
+            self._send_error_response(500, f"Failed to initialize Groq client: {str(groq_init_error)}")
+            return None
+    
+    def _request_questions(self, client, template, num_questions, content):
+        """Pide las preguntas al modelo y devuelve la respuesta JSON ya parseada"""
+        # Llamar a Groq con manejo de errores mejorado
+        try:
+            response = client.chat.completions.create(
+                model=GROQ_MODEL,
+                messages=template.messages(num_questions, content),
+                temperature=template.temperature,
+                max_tokens=template.max_tokens
+            )
+            
+            response_text = response.choices[0].message.content.strip()
+            
+            # Limpiar la respuesta de caracteres problemáticos
+            response_text = response_text.encode('utf-8', errors='ignore').decode('utf-8')
+            
+        except Exception as groq_error:
+            raise Exception(f"Groq API error: {str(groq_error)}")
+        
+        # Parsear respuesta JSON con manejo mejorado
+        try:
+            start_idx = response_text.find('{')
+            end_idx = response_text.rfind('}') + 1
+            
+            if start_idx == -1 or end_idx == 0:
+                raise ValueError("No JSON found in response")
                 
+            json_text = response_text[start_idx:end_idx]
+            
+            # Limpiar el JSON de caracteres problemáticos
+            json_text = json_text.replace('\x00', '').replace('\ufffd', '')
+            
+            return json.loads(json_text)
+            
+        except json.JSONDecodeError as json_error:
+            raise Exception(f"Invalid JSON response from AI: {str(json_error)}")
+        except Exception as parse_error:
+            raise Exception(f"Error parsing AI response: {str(parse_error)}")
+    
+    def _generate_from_documents(self, form, pdf_files):
+        """
+        Genera un único examen a partir de varios PDFs. Los documentos se
+        extraen en paralelo, cada uno recibe un cupo de preguntas proporcional
+        a su contenido y las generaciones se lanzan también en paralelo, de
+        modo que la petición tarda aproximadamente lo que el documento mayor.
+        """
+        exam_type = form.getvalue('examType', 'test')
+        tables = str(form.getvalue('tables', '')).lower() in ('1', 'true', 'yes')
+        if form.getvalue('mode', 'full') == 'diff':
+            self._send_error_response(400, "Diff mode supports a single PDF")
+            return
+        if pdf_extractor is None:
+            self._send_error_response(500, "PDF content extraction not available in this environment")
+            return
+        
+        try:
+            extracted = self._extract_documents([f.file.read() for f in pdf_files], tables)
         except Exception as e:
-            raise Exception(f"PDF extraction failed: {str(e)}")
+            self._send_error_response(500, f"PDF extraction failed: {str(e)}")
+            return
+        
+        documents = []
+        for pdf_file, pages in zip(pdf_files, extracted):
+            documents.append({
+                "file": os.path.basename(pdf_file.filename),
+                "pages": pages,
+                "content": self._clean_content(pdf_extractor.join_pages(pages))
+            })
+        
+        # El total crece si hay más documentos que preguntas, para que ninguno quede sin preguntas
+        sizes = [len(d['content'].strip()) for d in documents]
+        total_questions = DEFAULT_NUM_QUESTIONS.get(exam_type, DEFAULT_NUM_QUESTIONS['development'])
+        total_questions = max(total_questions, sum(1 for size in sizes if size))
+        quotas = self._question_quotas(sizes, total_questions)
+        if not any(quotas):
+            self._send_error_response(400, "Content is required")
+            return
+        
+        client = self._create_groq_client()
+        if client is None:
+            return
+        template = _prompts.get_template(exam_type, GROQ_MODEL)
+        
+        # Las llamadas al modelo esperan a la red, así que bastan hilos
+        with ThreadPoolExecutor(max_workers=len(documents)) as executor:
+            futures = [
+                executor.submit(self._request_questions, client, template, quota, document['content']) if quota else None
+                for document, quota in zip(documents, quotas)
+            ]
+            try:
+                responses = [future.result() if future else {"questions": []} for future in futures]
+            except Exception as generation_error:
+                self._send_error_response(500, str(generation_error))
+                return
+        
+        # Unir las preguntas etiquetadas con su documento y renumerarlas
+        questions = []
+        summary = []
+        for document, quota, response_data in zip(documents, quotas, responses):
+            document_id = self._store_document(document['pages'], tables)
+            for question in response_data.get('questions', []):
+                question['sourceFile'] = document['file']
+                if document_id:
+                    question['documentId'] = document_id
+                questions.append(question)
+            summary.append({
+                "file": document['file'],
+                "documentId": document_id,
+                "numQuestions": quota,
+                "pages": self._page_manifest(document['pages'])
+            })
+        
+        for index, question in enumerate(questions, 1):
+            question['id'] = index
+        
+        self._send_success_response({
+            "questions": questions,
+            "documents": summary,
+            "promptVersion": template.version
+        })
     
-    def _send_success_response(self, data):
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+    def _extract_documents(self, pdf_contents, tables=False):
+        """
+        Extrae varios PDFs en paralelo y devuelve sus páginas en el mismo orden.
+        La extracción consume CPU, así que se reparte entre los procesos del
+        pool compartido; donde no hay soporte para ello (p. ej. sin /dev/shm)
+        o si el pool se rompe (un proceso hijo muere) se recurre a hilos.
+        """
+        temp_file_paths = []
+        try:
+            for pdf_content in pdf_contents:
+                with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
+                    temp_file.write(pdf_content)
+                    temp_file_paths.append(temp_file.name)
+            
+            count = len(temp_file_paths)
+            arguments = (temp_file_paths, [None] * count, [tables] * count)
+            
+            pool = _get_extraction_pool()
+            if pool is not None:
+                try:
+                    extracted = list(pool.map(pdf_extractor.extract_pages, *arguments))
+                    _mark_extraction_pool_healthy(pool)
+                    return extracted
+                except BrokenProcessPool as pool_error:
+                    print(f"DEBUG: Extraction pool broken, retrying with threads: {pool_error}")
+                    _discard_extraction_pool(pool)
+            
+            with ThreadPoolExecutor(max_workers=count) as executor:
+                return list(executor.map(pdf_extractor.extract_pages, *arguments))
+        finally:
+            # Limpiar archivos temporales
+            for temp_file_path in temp_file_paths:
+                try:
+                    os.unlink(temp_file_path)
+                except:
+                    pass
+    
+    def _question_quotas(self, sizes, total):
+        """
+        Reparte total preguntas proporcionalmente a sizes (método del mayor
+        resto). Cada documento con contenido recibe al menos una pregunta
+        mientras haya documentos con más de una de las que quitarla.
+        """
+        total_size = sum(sizes)
+        if not total_size:
+            return [0] * len(sizes)
+        
+        exact = [total * size / total_size for size in sizes]
+        quotas = [int(value) for value in exact]
+        by_remainder = sorted(range(len(sizes)), key=lambda i: exact[i] - quotas[i], reverse=True)
+        for i in by_remainder[:total - sum(quotas)]:
+            quotas[i] += 1
+        
+        for i, size in enumerate(sizes):
+            if size and not quotas[i]:
+                donor = max(range(len(sizes)), key=lambda j: quotas[j])
+                if quotas[donor] > 1:
+                    quotas[donor] -= 1
+                    quotas[i] += 1
+        
+        return quotas
+    
+    def _page_manifest(self, pages):
+        """Devuelve las páginas sin texto, tal y como el cliente debe reenviarlas en modo diff"""
+        return [
+            {"page": p['page'], "fingerprint": p['fingerprint'], "tables": p['tables'], "elapsedMs": p['elapsed_ms']}
+            for p in pages
+        ]
+    
+    def _plan_diff(self, pages, previous_pages, previous_questions):
+        """
+        Separa las preguntas anteriores entre las que se conservan y las que
+        hay que regenerar. Una pregunta se conserva si la página de la que
+        procede sigue existiendo con la misma huella; su sourcePage se
+        actualiza por si la página ha cambiado de posición.
+        """
+        previous_fingerprints = {
+            p['page']: p['fingerprint'] for p in self._valid_previous_pages(previous_pages)
+        }
+        current_page_by_fingerprint = {}
+        for page in pages:
+            current_page_by_fingerprint.setdefault(page['fingerprint'], page['page'])
+        
+        kept_questions = []
+        dropped_count = 0
+        for question in previous_questions:
+            if not isinstance(question, dict):
+                continue
+            source_page = question.get('sourcePage')
+            fingerprint = None
+            if isinstance(source_page, int) and not isinstance(source_page, bool):
+                fingerprint = previous_fingerprints.get(source_page)
+            if fingerprint in current_page_by_fingerprint:
+                kept_questions.append(dict(question, sourcePage=current_page_by_fingerprint[fingerprint]))
+            else:
+                dropped_count += 1
+        
+        return kept_questions, dropped_count
     
-    def _send_error_response(self, status_code, message):
-        self.send_response(status_code)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
-        self.wfile.write(json.dumps({"error": message}).encode())
+    def _valid_previous_pages(self, previous_pages):
+        """
+        Entradas de previousPages con página entera y huella de texto; el
+        resto (p. ej. {} o [1], que no se pueden indexar) se ignora
+        """
+        return [
+            p for p in previous_pages
+            if isinstance(p, dict)
+            and isinstance(p.get('page'), int) and not isinstance(p.get('page'), bool)
+            and isinstance(p.get('fingerprint'), str)
+        ]
     
-    def do_OPTIONS(self):
-        self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
\ No newline at end of file
+    def _merge_diff_response(self, response_data, kept_questions, pages):
+        """Une las preguntas conservadas con las regeneradas y las renumera"""
+        questions = kept_questions + response_data.get('questions', [])
+        for index, question in enumerate(questions, 1):
+            question['id'] = index
+        
+        response_data['questions'] = questions
+        response_data['pages'] = self._page_manifest(pages)
+        response_data['changedPages'] = [p['page'] for p in pages if p['changed']]
+        response_data['mode'] = 'diff'
+        return response_data
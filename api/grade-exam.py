@@ -1,10 +1,19 @@
-from http.server import BaseHTTPRequestHandler
 import json
 import os
+import sys
 import cgi
 from groq import Groq
 
-class handler(BaseHTTPRequestHandler):
+# _base vive junto a los handlers y document_store en la raíz del proyecto
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _base import JSONHandler
+import document_store
+
+# Longitud máxima del extracto del material original por pregunta
+SOURCE_EXCERPT_CHARS = 1500
+
+class handler(JSONHandler):
     def do_POST(self):
         print(f"DEBUG: GRADE-EXAM endpoint called. Path: {self.path}")
         print(f"DEBUG: GRADE-EXAM Headers: {dict(self.headers)}")
@@ -80,7 +89,8 @@ class handler(BaseHTTPRequestHandler):
                         
                         request_data = {
                             'questions': questions_data,
-                            'userAnswers': user_answers_data
+                            'userAnswers': user_answers_data,
+                            'documentId': form.getvalue('documentId')
                         }
                     else:
                         # Parsear como JSON (método principal para calificación)
@@ -206,9 +216,9 @@ class handler(BaseHTTPRequestHandler):
                         self._send_error_response(500, f"Failed to initialize Groq client: {str(groq_init_error)}")
                         return
                     
-                    # Preparar datos para IA
+                    # Preparar datos para IA, con el material original si está guardado
                     exam_data = {
-                        "questions": development_questions,
+                        "questions": self._with_source_excerpts(development_questions, request_data.get('documentId')),
                         "user_answers": [{"questionId": a.get('questionId'), "answer": a.get('answer', a.get('textAnswer', ''))} for a in development_answers]
                     }
                     
@@ -227,6 +237,7 @@ Instrucciones:
    - Uso correcto de terminología
 3. Proporciona explicación detallada de la calificación
 4. Indica si la respuesta es correcta (score >= 60) o incorrecta (score < 60)
+5. Si una pregunta incluye "sourceExcerpt", úsalo como referencia del material original
 
 Formato JSON requerido:
 {{
@@ -296,27 +307,44 @@ Formato JSON requerido:
         except Exception as e:
             self._send_error_response(500, f"Error grading exam: {str(e)}")
     
-    def do_OPTIONS(self):
-        self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
-    
-    def _send_success_response(self, data):
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+    def _with_source_excerpts(self, questions, document_id):
+        """
+        Añade a cada pregunta con sourcePage un extracto de su página, leído
+        del DocumentStore sin cargar el documento completo. Cada pregunta puede
+        traer su propio documentId (exámenes de varios PDFs); si no, se usa el
+        de la petición.
+        """
+        store = document_store.DocumentStore()
+        documents = {}
+        enriched = []
+        try:
+            for question in questions:
+                question_document_id = question.get('documentId') or document_id
+                source_page = self._parse_source_page(question.get('sourcePage'))
+                # Un id que no sea texto (p. ej. 123 o una lista) solo deja la pregunta sin extracto
+                if isinstance(question_document_id, str) and source_page is not None:
+                    if question_document_id not in documents:
+                        try:
+                            documents[question_document_id] = store.open(question_document_id)
+                        except (OSError, ValueError) as store_error:
+                            print(f"DEBUG GRADE: Could not read stored document: {store_error}")
+                            documents[question_document_id] = None
+                    document = documents[question_document_id]
+                    if document is not None and 1 <= source_page <= document.page_count:
+                        excerpt = document.page_text(source_page)[:SOURCE_EXCERPT_CHARS]
+                        question = dict(question, sourceExcerpt=excerpt)
+                enriched.append(question)
+        finally:
+            for document in documents.values():
+                if document is not None:
+                    document.close()
+        return enriched
     
-    def _send_error_response(self, status_code, message):
-        self.send_response(status_code)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
-        self.wfile.write(json.dumps({"error": message}).encode())
\ No newline at end of file
+    def _parse_source_page(self, value):
+        """Número de página de sourcePage (el modelo a veces lo da como texto), o None"""
+        if isinstance(value, bool):
+            return None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
@@ -1,32 +1,25 @@
-from http.server import BaseHTTPRequestHandler
-import json
+import os
+import sys
 
-class handler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
-        
-        response = {
-            "message": "PDF Exam Generator API - Vercel Serverless",
-            "version": "1.0.0",
-            "status": "active",
-            "timestamp": "2025-10-19",
-            "endpoints": {
-                "health": "/api/health",
-                "generate_questions": "/api/generate-questions", 
-                "grade_exam": "/api/grade-exam",
-                "extract_text": "/api/extract-text-from-image"
-            }
-        }
-        self.wfile.write(json.dumps(response, indent=2).encode())
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _base import JSONHandler, StaticPayload
+
+# El contenido es constante: se serializa una vez y se sirve con ETag
+HEALTH_PAYLOAD = StaticPayload({
+    "message": "PDF Exam Generator API - Vercel Serverless",
+    "version": "1.0.0",
+    "status": "active",
+    "timestamp": "2025-10-19",
+    "endpoints": {
+        "health": "/api/health",
+        "generate_questions": "/api/generate-questions", 
+        "grade_exam": "/api/grade-exam",
+        "extract_text": "/api/extract-text-from-image"
+    }
+})
 
-    def do_OPTIONS(self):
-        self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
\ No newline at end of file
+class handler(JSONHandler):
+    allowed_methods = 'GET, POST, OPTIONS'
+
+    def do_GET(self):
+        self._send_static_response(HEALTH_PAYLOAD)
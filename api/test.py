@@ -1,23 +1,18 @@
-from http.server import BaseHTTPRequestHandler
-import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _base import JSONHandler
+
+class handler(JSONHandler):
+    allowed_methods = 'GET, POST, OPTIONS'
 
-class handler(BaseHTTPRequestHandler):
     def do_GET(self):
         print("DEBUG: TEST endpoint called with GET")
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        
         response = {"message": "Test endpoint working", "method": "GET"}
-        self.wfile.write(json.dumps(response).encode())
+        self._send_success_response(response)
     
     def do_POST(self):
         print("DEBUG: TEST endpoint called with POST")
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        
         response = {"message": "Test endpoint working", "method": "POST"}
-        self.wfile.write(json.dumps(response).encode())
\ No newline at end of file
+        self._send_success_response(response)
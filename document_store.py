@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Document Store para textos extraídos de PDFs
+Guarda cada documento en disco como un índice de páginas más un blob de
+texto UTF-8, y los lee con mmap para poder obtener cualquier rango de
+páginas sin cargar el documento entero en memoria
+"""
+
+import os
+import sys
+import json
+import mmap
+import struct
+import time
+import uuid
+import hashlib
+import tempfile
+from pathlib import Path
+
+# Cabecera del índice: magic + número de páginas + flags (bit 0: texto
+# extraído en modo tablas). Le siguen las huellas de cada página (32 bytes),
+# el número de tablas de cada página (4 bytes) y los offsets de inicio de
+# cada página en el blob más un offset final (8 bytes cada uno)
+INDEX_MAGIC = b"PDXIDX02"
+HEADER = struct.Struct("<8sQQ")
+TABLE_COUNT = struct.Struct("<I")
+OFFSET = struct.Struct("<Q")
+FINGERPRINT_SIZE = 32
+FLAG_TABLES = 1
+
+# Tamaño máximo por defecto del almacén; al superarlo se eliminan los
+# documentos usados hace más tiempo
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Los temporales de escrituras interrumpidas se borran pasado este tiempo
+STALE_TMP_SECONDS = 3600
+
+class StoredDocument:
+    """Documento abierto con mmap; las páginas se numeran desde 1"""
+
+    def __init__(self, index_path, text_path):
+        self._files = []
+        self._index = self._map(index_path)
+        self._text = self._map(text_path)
+
+        magic, self.page_count, flags = HEADER.unpack_from(self._index, 0)
+        if magic != INDEX_MAGIC:
+            self.close()
+            raise ValueError(f"Invalid document index: {index_path}")
+
+        self.tables = bool(flags & FLAG_TABLES)
+        self._fingerprints_at = HEADER.size
+        self._tables_at = self._fingerprints_at + FINGERPRINT_SIZE * self.page_count
+        self._offsets_at = self._tables_at + TABLE_COUNT.size * self.page_count
+
+    def _map(self, path):
+        handle = open(path, "rb")
+        self._files.append(handle)
+        if os.fstat(handle.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _offset(self, position):
+        return OFFSET.unpack_from(self._index, self._offsets_at + OFFSET.size * position)[0]
+
+    def fingerprint(self, page_num):
+        """Huella de la página page_num"""
+        self._check_page(page_num)
+        start = self._fingerprints_at + FINGERPRINT_SIZE * (page_num - 1)
+        return self._index[start:start + FINGERPRINT_SIZE].hex()
+
+    def page_tables(self, page_num):
+        """Número de tablas detectadas en la página page_num"""
+        self._check_page(page_num)
+        return TABLE_COUNT.unpack_from(self._index, self._tables_at + TABLE_COUNT.size * (page_num - 1))[0]
+
+    def page_text(self, page_num):
+        """Texto de la página page_num"""
+        self._check_page(page_num)
+        return self._text[self._offset(page_num - 1):self._offset(page_num)].decode("utf-8")
+
+    def page_range(self, start=1, end=None):
+        """
+        Texto de las páginas start..end (ambas incluidas) con los
+        marcadores de página habituales
+        """
+        end = self.page_count if end is None else min(end, self.page_count)
+        start = max(start, 1)
+
+        text_content = ""
+        for page_num in range(start, end + 1):
+            page_text = self.page_text(page_num)
+            if page_text:
+                text_content += f"\n--- Página {page_num} ---\n"
+                text_content += page_text + "\n"
+        return text_content.strip()
+
+    def _check_page(self, page_num):
+        if not 1 <= page_num <= self.page_count:
+            raise IndexError(f"Page {page_num} out of range (1-{self.page_count})")
+
+    def close(self):
+        for mapped in (getattr(self, "_index", None), getattr(self, "_text", None)):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+        for handle in self._files:
+            handle.close()
+        self._files = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class DocumentStore:
+    """
+    Almacén de documentos extraídos en un directorio local
+
+    Los documentos se identifican por el hash de su contenido (modo de
+    extracción, huellas, número de tablas y texto de cada página), así que
+    son inmutables: una nueva versión del PDF, o el mismo PDF extraído en
+    otro modo, es otro documento. El directorio es prescindible: cuando
+    supera max_bytes se eliminan los documentos usados hace más tiempo.
+    """
+
+    def __init__(self, root=None, max_bytes=None):
+        if root is None:
+            root = os.getenv("DOCUMENT_STORE_DIR") or os.path.join(tempfile.gettempdir(), "pdf-exam-documents")
+        if max_bytes is None:
+            max_bytes = int(os.getenv("DOCUMENT_STORE_MAX_BYTES") or DEFAULT_MAX_BYTES)
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+
+    def _paths(self, doc_id):
+        if not isinstance(doc_id, str) or not doc_id or any(char not in "0123456789abcdef" for char in doc_id):
+            raise ValueError(f"Invalid document id: {doc_id!r}")
+        return self.root / f"{doc_id}.idx", self.root / f"{doc_id}.txt"
+
+    def __contains__(self, doc_id):
+        try:
+            index_path, text_path = self._paths(doc_id)
+        except ValueError:
+            return False
+        return index_path.exists() and text_path.exists()
+
+    def put(self, pages, tables=False):
+        """
+        Guarda un documento
+
+        Args:
+            pages (list): Páginas en el formato de pdf_extractor.extract_pages,
+                todas con su texto
+            tables (bool): Si el texto se extrajo en modo tablas
+
+        Returns:
+            str: Identificador del documento
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        # El texto se escribe a un temporal mientras se calcula el id
+        digest = hashlib.sha256(b"tables" if tables else b"plain")
+        offsets = [0]
+        fingerprints = bytearray()
+        table_counts = bytearray()
+        tmp_name = f".{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        tmp_text = self.root / f"text{tmp_name}"
+        tmp_index = self.root / f"index{tmp_name}"
+        try:
+            with open(tmp_text, "wb") as text_file:
+                for page in pages:
+                    if page.get("text") is None:
+                        raise ValueError(f"Page {page['page']} has no text")
+                    encoded = page["text"].encode("utf-8")
+                    fingerprint = bytes.fromhex(page["fingerprint"])
+                    table_count = TABLE_COUNT.pack(page.get("tables", 0))
+                    digest.update(fingerprint + table_count + OFFSET.pack(len(encoded)))
+                    digest.update(encoded)
+                    text_file.write(encoded)
+                    offsets.append(offsets[-1] + len(encoded))
+                    fingerprints += fingerprint
+                    table_counts += table_count
+
+            doc_id = digest.hexdigest()
+            index_path, text_path = self._paths(doc_id)
+            if doc_id in self:
+                os.utime(index_path)
+                return doc_id
+
+            with open(tmp_index, "wb") as index_file:
+                index_file.write(HEADER.pack(INDEX_MAGIC, len(pages), FLAG_TABLES if tables else 0))
+                index_file.write(fingerprints)
+                index_file.write(table_counts)
+                index_file.write(b"".join(OFFSET.pack(offset) for offset in offsets))
+
+            # El blob se publica antes que el índice: un índice visible implica
+            # que su texto ya está completo
+            os.replace(tmp_text, text_path)
+            os.replace(tmp_index, index_path)
+        finally:
+            for tmp_path in (tmp_text, tmp_index):
+                try:
+                    tmp_path.unlink()
+                except FileNotFoundError:
+                    pass
+
+        self.prune(keep=doc_id)
+        return doc_id
+
+    def prune(self, keep=None):
+        """
+        Elimina los documentos usados hace más tiempo hasta que el almacén
+        ocupe como mucho max_bytes, además de temporales abandonados. El uso
+        se mide con la fecha de modificación del índice, que open() actualiza.
+        """
+        documents = {}
+        total = 0
+        now = time.time()
+        try:
+            entries = list(os.scandir(self.root))
+        except FileNotFoundError:
+            return
+
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if entry.name.endswith(".tmp"):
+                if now - stat.st_mtime > STALE_TMP_SECONDS:
+                    self._remove(Path(entry.path))
+                continue
+            doc_id, _, suffix = entry.name.partition(".")
+            if suffix not in ("idx", "txt"):
+                continue
+            document = documents.setdefault(doc_id, {"size": 0, "used": now})
+            document["size"] += stat.st_size
+            if suffix == "idx":
+                document["used"] = stat.st_mtime
+            total += stat.st_size
+
+        for doc_id, document in sorted(documents.items(), key=lambda item: item[1]["used"]):
+            if total <= self.max_bytes:
+                break
+            if doc_id == keep:
+                continue
+            # Primero el índice, para que el documento deje de ser visible
+            self._remove(self.root / f"{doc_id}.idx")
+            self._remove(self.root / f"{doc_id}.txt")
+            total -= document["size"]
+
+    def _remove(self, path):
+        try:
+            path.unlink()
+        except OSError:
+            # En Windows no se puede borrar un fichero abierto con mmap
+            pass
+
+    def open(self, doc_id):
+        """Abre un documento guardado; lanza FileNotFoundError si no existe"""
+        index_path, text_path = self._paths(doc_id)
+        if doc_id not in self:
+            raise FileNotFoundError(f"Document not found: {doc_id}")
+        document = StoredDocument(index_path, text_path)
+        try:
+            os.utime(index_path)
+        except OSError:
+            pass
+        return document
+
+def main():
+    """Función principal para uso desde línea de comandos"""
+    if len(sys.argv) not in (2, 3, 4):
+        print(json.dumps({
+            "success": False,
+            "error": "Usage: python document_store.py <document_id> [page_start] [page_end]"
+        }))
+        sys.exit(1)
+
+    doc_id = sys.argv[1]
+    start = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    end = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    try:
+        with DocumentStore().open(doc_id) as document:
+            text_content = document.page_range(start, end)
+            result = {
+                "success": True,
+                "pages": document.page_count,
+                "text": text_content,
+                "length": len(text_content)
+            }
+    except (OSError, ValueError) as e:
+        result = {
+            "success": False,
+            "error": f"Error reading document: {str(e)}"
+        }
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Servidor Groq falso para pruebas de carga
+Responde a /openai/v1/chat/completions con preguntas o calificaciones
+sintéticas, simulando la latencia del modelo y errores 429
+
+Los handlers lo usan sin cambios apuntando GROQ_BASE_URL a este servidor.
+"""
+
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeGroqConfig:
+    """
+    Parámetros de la simulación
+
+    Args:
+        latency_ms (float): Mediana de la latencia de cada completion
+        latency_sigma (float): Dispersión de la distribución log-normal
+        rate_limit_probability (float): Probabilidad de responder 429
+        rate_limit_rps (float): Peticiones por segundo admitidas antes de
+            responder 429 (0 = sin límite)
+        retry_after (float): Valor de la cabecera Retry-After en los 429
+        seed (int, optional): Semilla para reproducir una ejecución
+    """
+
+    def __init__(self, latency_ms=1500, latency_sigma=0.4, rate_limit_probability=0.0,
+                 rate_limit_rps=0, retry_after=1, seed=None):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.rate_limit_probability = rate_limit_probability
+        self.rate_limit_rps = rate_limit_rps
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+
+class FakeGroqState:
+    """Contadores compartidos por los hilos del servidor"""
+
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        self.recent = deque()
+        self.completions = 0
+        self.rate_limited = 0
+
+    def admit(self):
+        """Decide si la petición se atiende o recibe un 429"""
+        with self.lock:
+            now = time.monotonic()
+            while self.recent and now - self.recent[0] > 1.0:
+                self.recent.popleft()
+
+            limited = self.config.random.random() < self.config.rate_limit_probability
+            if self.config.rate_limit_rps and len(self.recent) >= self.config.rate_limit_rps:
+                limited = True
+
+            if limited:
+                self.rate_limited += 1
+                return False
+
+            self.recent.append(now)
+            self.completions += 1
+            return True
+
+    def latency(self):
+        with self.lock:
+            factor = self.config.random.lognormvariate(0, self.config.latency_sigma)
+        return self.config.latency_ms * factor / 1000
+
+def _fake_questions(prompt):
+    """Preguntas sintéticas con el número y las páginas que pide el prompt"""
+    match = re.search(r"exactamente (\d+)", prompt)
+    count = int(match.group(1)) if match else 5
+    pages = [int(page) for page in re.findall(r"--- Página (\d+) ---", prompt)] or [1]
+    development = "preguntas de desarrollo" in prompt
+
+    questions = []
+    for index in range(1, count + 1):
+        question = {
+            "id": index,
+            "question": f"Pregunta sintética {index}",
+            "explanation": "Explicación sintética",
+            "sourcePage": pages[(index - 1) % len(pages)]
+        }
+        if development:
+            question.update(correctAnswer="", type="development", expectedAnswer="Respuesta esperada")
+        else:
+            question.update(
+                options=["A) Uno", "B) Dos", "C) Tres", "D) Cuatro"],
+                correctAnswer=index % 4,
+                type="multiple-choice"
+            )
+        questions.append(question)
+    return {"questions": questions}
+
+def _fake_grades(prompt):
+    """Calificaciones sintéticas para cada questionId del prompt"""
+    ids = [int(value) for value in re.findall(r'"questionId": (\d+)', prompt)]
+    return {"results": [
+        {
+            "questionId": question_id,
+            "userAnswer": "",
+            "correctAnswer": "Respuesta modelo",
+            "explanation": "Calificación sintética",
+            "isCorrect": question_id % 2 == 0,
+            "score": 70 if question_id % 2 == 0 else 40
+        }
+        for question_id in sorted(set(ids))
+    ]}
+
+def make_handler(state):
+    """Crea la clase handler ligada al estado de la simulación"""
+
+    class FakeGroqHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if not self.path.endswith("/chat/completions"):
+                self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+                return
+
+            if not state.admit():
+                self._send(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+                           {"Retry-After": str(state.config.retry_after)})
+                return
+
+            request = json.loads(body or b"{}")
+            prompt = "\n".join(message.get("content", "") for message in request.get("messages", []))
+            time.sleep(state.latency())
+
+            if "Califica" in prompt:
+                content = _fake_grades(prompt)
+            else:
+                content = _fake_questions(prompt)
+
+            self._send(200, {
+                "id": f"chatcmpl-fake-{state.completions}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "fake"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": json.dumps(content, ensure_ascii=False)},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 0, "total_tokens": len(prompt) // 4}
+            })
+
+        def _send(self, status_code, data, headers=None):
+            payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+            self.send_response(status_code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeGroqHandler
+
+def start(config, host="127.0.0.1", port=0):
+    """
+    Arranca el servidor en un hilo en segundo plano
+
+    Returns:
+        tuple: (servidor, estado); la URL base es http://host:server.server_port
+    """
+    state = FakeGroqState(config)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+def main():
+    """Función principal para uso desde línea de comandos"""
+    parser = argparse.ArgumentParser(description="Fake Groq server for load tests")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=1500)
+    parser.add_argument("--latency-sigma", type=float, default=0.4)
+    parser.add_argument("--rate-limit-probability", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rps", type=float, default=0)
+    parser.add_argument("--retry-after", type=float, default=1)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    config = FakeGroqConfig(args.latency_ms, args.latency_sigma, args.rate_limit_probability,
+                            args.rate_limit_rps, args.retry_after, args.seed)
+    server, _ = start(config, port=args.port)
+    print(f"Fake Groq listening on http://127.0.0.1:{server.server_port} (GROQ_BASE_URL)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        sys.exit(0)
+
+if __name__ == "__main__":
+    main()
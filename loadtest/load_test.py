@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga de los handlers de api/ con un Groq falso local
+
+Arranca el servidor Groq falso y uno o varios workers (procesos que sirven
+los handlers), y lanza mezclas de subidas de PDF y calificaciones a
+concurrencias crecientes. Para cada escalón informa del throughput, las
+latencias p50/p95/p99, el desglose por etapas y la CPU/memoria de cada worker.
+
+Ejemplo:
+    python loadtest/load_test.py --concurrency 1,4,16,32 --requests 200 \\
+        --mix generate=3,grade=1 --latency-ms 2000 --rate-limit-rps 30
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import argparse
+import tempfile
+import subprocess
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import fake_groq
+
+STAGES = ("extract", "store", "llm", "server")
+
+def percentile(values, fraction):
+    """Percentil por rango más cercano; None si no hay valores"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    # El redondeo evita que errores de coma flotante (0.07 * 100) suban un rango
+    index = max(0, min(len(ordered) - 1, math.ceil(round(fraction * len(ordered), 9)) - 1))
+    return ordered[index]
+
+def sample_pdf(num_pages, seed=0):
+    """
+    Genera un PDF mínimo de num_pages páginas de prosa
+
+    Returns:
+        bytes: Contenido del PDF
+    """
+    rng = random.Random(seed)
+    words = ("la", "célula", "energía", "proceso", "fotosíntesis", "membrana", "sistema",
+             "historia", "ecuación", "función", "estructura", "análisis", "de", "en", "el")
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(num_pages))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {num_pages} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    for page in range(num_pages):
+        lines = [" ".join(rng.choice(words) for _ in range(12)) for _ in range(40)]
+        stream = "BT /F1 10 Tf 50 760 Td 16 TL " + " ".join(f"({line}) Tj T*" for line in lines) + " ET"
+        stream = stream.encode("cp1252")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * page} 0 R >>".encode()
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    output += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(output)
+
+def multipart(fields, files):
+    """Codifica un FormData; files es una lista de (campo, nombre, bytes)"""
+    boundary = uuid.uuid4().hex
+    body = bytearray()
+    for name, value in fields.items():
+        body += f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+    for name, filename, data in files:
+        body += (f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                 f'Content-Type: application/pdf\r\n\r\n').encode() + data + b"\r\n"
+    body += f"--{boundary}--\r\n".encode()
+    return bytes(body), f"multipart/form-data; boundary={boundary}"
+
+def grade_payload(num_test, num_development):
+    """Examen ya respondido con preguntas de test y de desarrollo"""
+    questions, answers = [], []
+    for question_id in range(1, num_test + num_development + 1):
+        if question_id <= num_test:
+            questions.append({"id": question_id, "question": "Pregunta", "options": ["A", "B", "C", "D"],
+                              "correctAnswer": question_id % 4, "explanation": "", "sourcePage": 1})
+            answers.append({"questionId": question_id, "answer": str(question_id % 3)})
+        else:
+            questions.append({"id": question_id, "question": "Explica el proceso", "type": "development",
+                              "expectedAnswer": "Respuesta esperada", "sourcePage": 1})
+            answers.append({"questionId": question_id, "textAnswer": "Respuesta del alumno " * 20})
+    return json.dumps({"questions": questions, "userAnswers": answers}).encode("utf-8")
+
+class Worker:
+    """Proceso que sirve los handlers en un puerto local"""
+
+    def __init__(self, env):
+        worker_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker.py")
+        self.process = subprocess.Popen([sys.executable, worker_path], env=env,
+                                        stderr=subprocess.PIPE, text=True)
+        self.port = int(self.process.stderr.readline())
+
+    def stats(self, reset=False):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+        connection.request("GET", "/__stats?reset=1" if reset else "/__stats")
+        data = json.loads(connection.getresponse().read())
+        connection.close()
+        return data
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait(timeout=10)
+
+class LoadTest:
+    """Ejecuta los escalones de concurrencia y agrega los resultados"""
+
+    def __init__(self, workers, mix, pdfs, grade_body, timeout, pdfs_per_request=1):
+        self.workers = workers
+        self.mix = mix
+        self.pdfs = pdfs
+        self.pdfs_per_request = pdfs_per_request
+        self.grade_body = grade_body
+        self.timeout = timeout
+
+    def _build_request(self, rng):
+        kind = rng.choices([name for name, _ in self.mix], [weight for _, weight in self.mix])[0]
+        if kind == "generate":
+            files = [("pdf", *rng.choice(self.pdfs)) for _ in range(self.pdfs_per_request)]
+            exam_type = rng.choice(("test", "development"))
+            body, content_type = multipart({"examType": exam_type}, files)
+            return kind, "/api/generate-questions", body, content_type
+        return kind, "/api/grade-exam", self.grade_body, "application/json"
+
+    def _client(self, index, deadline_count, counter, lock, results):
+        rng = random.Random(index)
+        worker = self.workers[index % len(self.workers)]
+        connection = http.client.HTTPConnection("127.0.0.1", worker.port, timeout=self.timeout)
+        while True:
+            with lock:
+                if counter[0] >= deadline_count:
+                    break
+                counter[0] += 1
+
+            kind, path, body, content_type = self._build_request(rng)
+            request_id = uuid.uuid4().hex
+            started = time.perf_counter()
+            try:
+                connection.request("POST", path, body=body, headers={
+                    "Content-Type": content_type,
+                    "Content-Length": str(len(body)),
+                    "X-Request-Id": request_id
+                })
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+                if response.getheader("Connection", "").lower() == "close":
+                    connection.close()
+            except (OSError, http.client.HTTPException) as error:
+                status = type(error).__name__
+                connection.close()
+            elapsed = (time.perf_counter() - started) * 1000
+            results.append({"id": request_id, "kind": kind, "status": status, "latency_ms": elapsed})
+        connection.close()
+
+    def run_step(self, concurrency, num_requests):
+        for worker in self.workers:
+            worker.stats(reset=True)
+        before = [worker.stats() for worker in self.workers]
+
+        results = []
+        counter = [0]
+        lock = threading.Lock()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for index in range(concurrency):
+                pool.submit(self._client, index, num_requests, counter, lock, results)
+        wall = time.perf_counter() - started
+
+        after = [worker.stats(reset=True) for worker in self.workers]
+        stages = {}
+        for stats in after:
+            stages.update(stats["requests"])
+
+        return summarize(concurrency, wall, results, stages, before, after)
+
+def summarize(concurrency, wall, results, stages, before, after):
+    """Resume un escalón: throughput, percentiles, etapas y recursos"""
+    latencies = [r["latency_ms"] for r in results if r["status"] == 200]
+    errors = {}
+    for result in results:
+        if result["status"] != 200:
+            errors[str(result["status"])] = errors.get(str(result["status"]), 0) + 1
+
+    by_kind = {}
+    for kind in sorted({r["kind"] for r in results}):
+        kind_latencies = [r["latency_ms"] for r in results if r["kind"] == kind and r["status"] == 200]
+        by_kind[kind] = {"count": len(kind_latencies), "p50_ms": percentile(kind_latencies, 0.5),
+                         "p95_ms": percentile(kind_latencies, 0.95)}
+
+    # Etapas: mediana y p95 por etapa; "network" es lo que el cliente
+    # espera fuera del handler (cola del servidor, transferencia)
+    stage_values = {stage: [] for stage in STAGES + ("network",)}
+    for result in results:
+        timings = stages.get(result["id"])
+        if not timings:
+            continue
+        for stage in STAGES:
+            if stage in timings:
+                stage_values[stage].append(timings[stage])
+        stage_values["network"].append(max(0.0, result["latency_ms"] - timings["server"]))
+    stage_summary = {
+        stage: {"p50_ms": percentile(values, 0.5), "p95_ms": percentile(values, 0.95)}
+        for stage, values in stage_values.items() if values
+    }
+
+    workers = []
+    for start, end in zip(before, after):
+        cpu = (end["cpu_user_s"] + end["cpu_system_s"]) - (start["cpu_user_s"] + start["cpu_system_s"])
+        workers.append({"pid": end["pid"], "cpu_percent": 100 * cpu / wall if wall else 0.0,
+                        "rss_mb": end["rss_kb"] / 1024, "max_rss_mb": end["max_rss_kb"] / 1024})
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "errors": errors,
+        "wall_s": wall,
+        # Solo cuentan las respuestas 200: los errores rápidos (p. ej. por 429
+        # del modelo) inflarían el throughput justo cuando cae la capacidad
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "total_rps": len(results) / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 0.5),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "by_kind": by_kind,
+        "stages": stage_summary,
+        "workers": workers
+    }
+
+def _ms(value):
+    return "-" if value is None else f"{value:.0f}"
+
+def print_report(steps, fake_state):
+    """Imprime una tabla por escalón con el desglose por etapas y workers"""
+    print(f"{'conc':>5} {'reqs':>6} {'err':>5} {'ok rps':>7} {'rps':>7} {'p50':>7} {'p95':>7} {'p99':>7}  stages p50/p95 (ms)")
+    for step in steps:
+        stages = "  ".join(f"{name}={_ms(values['p50_ms'])}/{_ms(values['p95_ms'])}"
+                           for name, values in step["stages"].items())
+        print(f"{step['concurrency']:>5} {step['requests']:>6} {sum(step['errors'].values()):>5} "
+              f"{step['throughput_rps']:>7.2f} {step['total_rps']:>7.2f} {_ms(step['p50_ms']):>7} "
+              f"{_ms(step['p95_ms']):>7} {_ms(step['p99_ms']):>7}  {stages}")
+        for kind, values in step["by_kind"].items():
+            print(f"{'':>5} {kind:>12}: n={values['count']} p50={_ms(values['p50_ms'])} p95={_ms(values['p95_ms'])}")
+        for worker in step["workers"]:
+            print(f"{'':>5} worker {worker['pid']}: cpu={worker['cpu_percent']:.0f}% "
+                  f"rss={worker['rss_mb']:.0f}MB max_rss={worker['max_rss_mb']:.0f}MB")
+        if step["errors"]:
+            print(f"{'':>5} errors: {step['errors']}")
+    print(f"fake groq: {fake_state.completions} completions, {fake_state.rate_limited} rate limited (429)")
+
+def _parse_mix(value):
+    mix = []
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in ("generate", "grade"):
+            raise argparse.ArgumentTypeError(f"Unknown request kind: {name}")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+def main():
+    """Función principal para uso desde línea de comandos"""
+    parser = argparse.ArgumentParser(description="Load test the API handlers against a fake Groq server")
+    parser.add_argument("--concurrency", default="1,2,4,8,16", help="Concurrency steps, e.g. 1,4,16")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per step")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes serving the handlers")
+    parser.add_argument("--mix", type=_parse_mix, default=_parse_mix("generate=3,grade=1"))
+    parser.add_argument("--pdf", action="append", default=[], help="PDF to upload (repeatable)")
+    parser.add_argument("--pdfs-per-request", type=int, default=1, help="PDFs uploaded in each generation")
+    parser.add_argument("--sample-pages", type=int, default=10, help="Pages of the generated sample PDF")
+    parser.add_argument("--grade-test", type=int, default=15, help="Test questions per grading request")
+    parser.add_argument("--grade-development", type=int, default=5, help="Development questions per grading request")
+    parser.add_argument("--latency-ms", type=float, default=1500, help="Median fake LLM latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.4, help="Log-normal sigma of the LLM latency")
+    parser.add_argument("--rate-limit-probability", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rps", type=float, default=0)
+    parser.add_argument("--retry-after", type=float, default=1)
+    parser.add_argument("--timeout", type=float, default=120, help="Client timeout per request (s)")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--json", help="Write the full results to this file")
+    args = parser.parse_args()
+
+    config = fake_groq.FakeGroqConfig(args.latency_ms, args.latency_sigma, args.rate_limit_probability,
+                                      args.rate_limit_rps, args.retry_after, args.seed)
+    fake_server, fake_state = fake_groq.start(config)
+
+    pdfs = [(os.path.basename(path), open(path, "rb").read()) for path in args.pdf]
+    if not pdfs:
+        pdfs = [("sample.pdf", sample_pdf(args.sample_pages))]
+
+    env = dict(os.environ,
+               GROQ_API_KEY="fake-key",
+               GROQ_BASE_URL=f"http://127.0.0.1:{fake_server.server_port}",
+               DOCUMENT_STORE_DIR=tempfile.mkdtemp(prefix="loadtest-documents-"))
+    workers = [Worker(env) for _ in range(args.workers)]
+
+    try:
+        load_test = LoadTest(workers, args.mix, pdfs, grade_payload(args.grade_test, args.grade_development),
+                             args.timeout, args.pdfs_per_request)
+        steps = []
+        for concurrency in (int(value) for value in args.concurrency.split(",")):
+            steps.append(load_test.run_step(concurrency, args.requests))
+            print_report(steps[-1:], fake_state)
+            print()
+    finally:
+        for worker in workers:
+            worker.stop()
+        fake_server.shutdown()
+
+    print_report(steps, fake_state)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump({"config": vars(args) | {"mix": args.mix}, "steps": steps}, output, indent=2)
+
+if __name__ == "__main__":
+    main()
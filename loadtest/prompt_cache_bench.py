@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Benchmark del registro de plantillas frente al prompt anterior
+
+Compara dos disposiciones del prompt de generación:
+    legacy    instrucciones con el {content} en medio, en un único mensaje
+    registry  instrucciones constantes (api/_prompts.py) y el contenido al final
+
+Cada petición usa un documento distinto, como ocurre en producción: con el
+mismo documento las dos disposiciones repetirían el prompt entero y ambas
+aprovecharían la caché del proveedor. Solo el registro comparte un prefijo
+largo (las instrucciones) entre documentos distintos.
+
+Mide el coste local de construir el prompt, el prefijo que comparten los
+mensajes de documentos distintos y, si hay GROQ_API_KEY, la latencia de cada
+petición y los tokens que el proveedor declara como cacheados. Se usa
+max_tokens bajo para que la latencia refleje sobre todo el procesamiento del
+prompt.
+
+Ejemplo:
+    GROQ_API_KEY=... python loadtest/prompt_cache_bench.py --repeats 5 --pages 20
+    python loadtest/prompt_cache_bench.py --content-file a.txt --content-file b.txt
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "api"))
+import _prompts
+
+def legacy_prompt(num_questions, content):
+    """Prompt de test tal y como lo construía generate-questions antes del registro"""
+    return f"""
+Genera exactamente {num_questions} preguntas de opción múltiple basadas en el siguiente contenido.
+
+CONTENIDO:
+{content}
+
+INSTRUCCIONES:
+- Crear exactamente {num_questions} preguntas de opción múltiple
+- Cada pregunta debe tener 4 opciones (A, B, C, D)
+- Solo una opción debe ser correcta
+- Las preguntas deben cubrir los puntos más importantes del contenido
+- Indica en "sourcePage" el número de página ("--- Página N ---") del que procede cada pregunta
+
+FORMATO DE RESPUESTA (JSON):
+{{
+  "questions": [
+    {{
+      "id": 1,
+      "question": "Pregunta aquí",
+      "options": ["A) Opción 1", "B) Opción 2", "C) Opción 3", "D) Opción 4"],
+      "correctAnswer": 0,
+      "explanation": "Explicación de por qué esta es la respuesta correcta",
+      "type": "multiple-choice",
+      "sourcePage": 1
+    }}
+  ]
+}}
+
+Responde SOLO con el JSON, sin texto adicional.
+"""
+
+def sample_content(num_pages, seed=0):
+    """Texto con marcadores de página similar al de pdf_extractor"""
+    rng = random.Random(seed)
+    words = ("la", "célula", "energía", "proceso", "fotosíntesis", "membrana", "sistema",
+             "historia", "ecuación", "función", "estructura", "análisis", "de", "en", "el")
+    pages = []
+    for page in range(1, num_pages + 1):
+        lines = (" ".join(rng.choice(words) for _ in range(12)) for _ in range(40))
+        pages.append(f"--- Página {page} ---\n" + "\n".join(lines))
+    return "\n\n".join(pages)
+
+def layouts(model):
+    """Constructores de mensajes de cada disposición para el modelo indicado"""
+    template = _prompts.get_template("test", model)
+    return {
+        "legacy": lambda num_questions, content: [{"role": "user", "content": legacy_prompt(num_questions, content)}],
+        "registry": template.messages
+    }
+
+def _serialize(messages):
+    return "".join(f"<{message['role']}>{message['content']}" for message in messages)
+
+def bench_build(documents, num_questions, iterations, model):
+    """Microsegundos por construcción de los mensajes en cada disposición"""
+    results = {}
+    for name, build in layouts(model).items():
+        build(num_questions, documents[0])
+        started = time.perf_counter()
+        for index in range(iterations):
+            build(num_questions, documents[index % len(documents)])
+        results[name] = (time.perf_counter() - started) / iterations * 1e6
+    return results
+
+def bench_shared_prefix(documents, num_questions, model):
+    """
+    Caracteres iniciales que los mensajes de cada documento comparten con
+    los del anterior, que es lo máximo que una caché de prefijos puede
+    reutilizar entre ellos
+    """
+    results = {}
+    for name, build in layouts(model).items():
+        prompts = [_serialize(build(num_questions, content)) for content in documents]
+        shared = [len(os.path.commonprefix([previous, current])) for previous, current in zip(prompts, prompts[1:])]
+        results[name] = {"shared_chars": min(shared) if shared else 0, "prompt_chars": len(prompts[0])}
+    return results
+
+def bench_remote(documents, num_questions, model):
+    """
+    Latencia de una petición por documento en cada disposición; los
+    documentos son distintos entre sí, así que solo se reutiliza el prefijo
+    común de la disposición
+    """
+    from groq import Groq
+
+    client = Groq(api_key=os.environ["GROQ_API_KEY"])
+    results = {}
+    for name, build in layouts(model).items():
+        runs = []
+        for content in documents:
+            messages = build(num_questions, content)
+            started = time.perf_counter()
+            response = client.chat.completions.create(
+                model=model, messages=messages, temperature=0, max_tokens=16
+            )
+            elapsed = (time.perf_counter() - started) * 1000
+            usage = response.usage.model_dump() if response.usage else {}
+            cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+            runs.append({"latency_ms": elapsed, "prompt_tokens": usage.get("prompt_tokens"), "cached_tokens": cached})
+        warm = sorted(run["latency_ms"] for run in runs[1:]) or [runs[0]["latency_ms"]]
+        results[name] = {"first_ms": runs[0]["latency_ms"], "warm_p50_ms": warm[len(warm) // 2], "runs": runs}
+    return results
+
+def main():
+    """Función principal para uso desde línea de comandos"""
+    parser = argparse.ArgumentParser(description="Prompt layout benchmark (prefix reuse)")
+    parser.add_argument("--pages", type=int, default=10, help="Pages of synthetic content")
+    parser.add_argument("--content-file", action="append",
+                        help="Use these text files as the documents instead (repeatable)")
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=2000, help="Iterations of the local build benchmark")
+    parser.add_argument("--repeats", type=int, default=5, help="Synthetic documents (requests per layout)")
+    parser.add_argument("--model", default=os.getenv("GROQ_MODEL", _prompts.DEFAULT_MODEL))
+    parser.add_argument("--json", help="Write the full results to this file")
+    args = parser.parse_args()
+
+    if args.content_file:
+        documents = []
+        for path in args.content_file:
+            with open(path, encoding="utf-8") as content_file:
+                documents.append(content_file.read())
+    else:
+        documents = [sample_content(args.pages, seed) for seed in range(max(args.repeats, 2))]
+
+    results = {
+        "model": args.model,
+        "prompt_version": _prompts.get_template("test", args.model).version,
+        "documents": len(documents),
+        "content_chars": [len(content) for content in documents],
+        "build_us": bench_build(documents, args.questions, args.iterations, args.model),
+        "shared_prefix": bench_shared_prefix(documents, args.questions, args.model)
+    }
+    for name, micros in results["build_us"].items():
+        print(f"build {name:>8}: {micros:.1f} us/prompt")
+    for name, values in results["shared_prefix"].items():
+        print(f"prefix {name:>8}: {values['shared_chars']} of {values['prompt_chars']} chars shared between documents")
+
+    if os.getenv("GROQ_API_KEY"):
+        results["remote"] = bench_remote(documents, args.questions, args.model)
+        for name, values in results["remote"].items():
+            cached = [run["cached_tokens"] for run in values["runs"]]
+            print(f"remote {name:>8}: first={values['first_ms']:.0f}ms warm_p50={values['warm_p50_ms']:.0f}ms "
+                  f"cached_tokens={cached}")
+    else:
+        print("GROQ_API_KEY not set: skipping remote latency measurements")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+
+if __name__ == "__main__":
+    main()
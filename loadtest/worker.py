@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Worker de pruebas de carga
+Sirve los handlers de api/ en un único proceso, como lo haría un worker en
+producción, y mide el tiempo de cada etapa de cada petición
+
+Rutas:
+    POST /api/generate-questions   handler de api/generate-questions.py
+    POST /api/grade-exam           handler de api/grade-exam.py
+    GET  /__stats                  CPU, memoria y etapas desde el último reset
+
+Las etapas de una petición incluyen el trabajo que lanza en hilos de un
+ThreadPoolExecutor y la extracción que hace el pool de procesos (sumando el
+elapsed_ms de cada página). En peticiones de varios PDFs esas tareas van en
+paralelo, así que extract y llm son tiempo acumulado y pueden superar a
+server. La CPU de los procesos del pool no se incluye en la del worker.
+"""
+
+import os
+import sys
+import time
+import signal
+import resource
+import argparse
+import functools
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(ROOT, "api")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, API_DIR)
+
+from _base import JSONHandler
+
+_local = threading.local()
+_timings_lock = threading.Lock()
+_stages_lock = threading.Lock()
+_stages = {}
+
+def _load_handler(filename):
+    """Importa un handler de api/ (los nombres con guiones no son importables)"""
+    path = os.path.join(API_DIR, filename)
+    spec = importlib.util.spec_from_file_location(filename.replace("-", "_")[:-3], path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.handler
+
+def _record(timings, stage, elapsed_ms):
+    """Suma elapsed_ms a la etapa; varios hilos pueden compartir timings"""
+    with _timings_lock:
+        timings[stage] = timings.get(stage, 0.0) + elapsed_ms
+
+def _timed(stage, function):
+    """Envuelve function para sumar su duración a la etapa de la petición en curso"""
+    # wraps conserva el nombre, así el wrapper sigue siendo serializable para
+    # el ProcessPoolExecutor de la extracción de varios PDFs
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            timings = getattr(_local, "timings", None)
+            if timings is not None:
+                _record(timings, stage, (time.perf_counter() - started) * 1000)
+    return wrapper
+
+def _propagate_timings(submit):
+    """Hace que las tareas enviadas a un ThreadPoolExecutor midan para la petición que las envía"""
+    @functools.wraps(submit)
+    def wrapper(self, function, /, *args, **kwargs):
+        timings = getattr(_local, "timings", None)
+        if timings is None:
+            return submit(self, function, *args, **kwargs)
+
+        def run(*args, **kwargs):
+            previous = getattr(_local, "timings", None)
+            _local.timings = timings
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _local.timings = previous
+        return submit(self, run, *args, **kwargs)
+    return wrapper
+
+def _pool_extraction(extract_documents):
+    """Suma a extract el tiempo de las páginas extraídas en el pool de procesos"""
+    @functools.wraps(extract_documents)
+    def wrapper(self, *args, **kwargs):
+        timings = getattr(_local, "timings", None)
+        recorded = timings.get("extract") if timings is not None else None
+        documents = extract_documents(self, *args, **kwargs)
+        # Si ningún extract_pages de este proceso ha medido nada, la
+        # extracción se hizo en los procesos hijos
+        if timings is not None and timings.get("extract") == recorded:
+            _record(timings, "extract", sum(page["elapsed_ms"] for pages in documents for page in pages))
+        return documents
+    return wrapper
+
+def _instrument(generate_handler):
+    """Mide extracción de PDF, llamadas al modelo y acceso al DocumentStore"""
+    import pdf_extractor
+    import document_store
+    from groq.resources.chat.completions import Completions
+
+    pdf_extractor.extract_pages = _timed("extract", pdf_extractor.extract_pages)
+    document_store.DocumentStore.put = _timed("store", document_store.DocumentStore.put)
+    Completions.create = _timed("llm", Completions.create)
+    ThreadPoolExecutor.submit = _propagate_timings(ThreadPoolExecutor.submit)
+    generate_handler._extract_documents = _pool_extraction(generate_handler._extract_documents)
+
+def _process_stats():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    rss_kb = 0
+    try:
+        with open("/proc/self/statm") as statm:
+            rss_kb = int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        pass
+    return {
+        "pid": os.getpid(),
+        "cpu_user_s": usage.ru_utime,
+        "cpu_system_s": usage.ru_stime,
+        "rss_kb": rss_kb,
+        "max_rss_kb": usage.ru_maxrss
+    }
+
+def make_router(routes):
+    """Crea un handler que delega cada ruta en el handler de api/ correspondiente"""
+
+    class Router(JSONHandler):
+        allowed_methods = "GET, POST, OPTIONS"
+
+        def do_GET(self):
+            if self.path.startswith("/__stats"):
+                with _stages_lock:
+                    requests = dict(_stages)
+                    if "reset" in self.path:
+                        _stages.clear()
+                self._send_success_response(dict(_process_stats(), requests=requests))
+            else:
+                self._send_error_response(404, f"Unknown path {self.path}")
+
+        def do_POST(self):
+            target = routes.get(self.path.split("?")[0])
+            if target is None:
+                self._send_error_response(404, f"Unknown path {self.path}")
+                return
+
+            # Reutiliza el estado ya parseado de la petición con la clase del handler
+            request_id = self.headers.get("X-Request-Id")
+            _local.timings = {}
+            started = time.perf_counter()
+            self.__class__ = target
+            try:
+                target.do_POST(self)
+            finally:
+                self.__class__ = Router
+                timings = _local.timings
+                _local.timings = None
+                timings["server"] = (time.perf_counter() - started) * 1000
+                if request_id:
+                    with _stages_lock:
+                        _stages[request_id] = timings
+
+        def log_message(self, format, *args):
+            pass
+
+    return Router
+
+def main():
+    """Función principal para uso desde línea de comandos"""
+    parser = argparse.ArgumentParser(description="Serve the API handlers for load tests")
+    parser.add_argument("--port", type=int, default=0)
+    args = parser.parse_args()
+
+    routes = {
+        "/api/generate-questions": _load_handler("generate-questions.py"),
+        "/api/grade-exam": _load_handler("grade-exam.py")
+    }
+    _instrument(routes["/api/generate-questions"])
+
+    # Los handlers escriben mucho en stdout; se silencia para no medir la consola
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_router(routes))
+    server.daemon_threads = True
+    sys.stderr.write(f"{server.server_port}\n")
+    sys.stderr.flush()
+    sys.stdout = open(os.devnull, "w")
+
+    # Salir con normalidad ante SIGTERM para que el pool de extracción
+    # cierre sus procesos en vez de quedar huérfanos
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
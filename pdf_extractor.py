@@ -6,15 +6,205 @@ Extrae texto de archivos PDF de forma confiable
 
 import sys
 import json
+import hashlib
+import time
 import pdfplumber
 from pathlib import Path
+from pdfminer.pdftypes import PDFObjRef, PDFStream
+from pdfminer.psparser import PSKeyword, PSLiteral
 
-def extract_text_from_pdf(pdf_path):
+def _hash_object(obj, digest, memo, active):
+    """
+    Añade al digest una serialización estable de un objeto PDF, resolviendo
+    referencias. No se usan los números de objeto, que pueden cambiar entre
+    versiones del mismo documento; memo guarda el hash de cada objeto ya
+    visto (p. ej. una fuente compartida por todas las páginas) y active evita
+    los ciclos.
+    """
+    if isinstance(obj, PDFObjRef):
+        objid = obj.objid
+        if objid in memo:
+            digest.update(memo[objid])
+        elif objid in active:
+            digest.update(b"R")
+        else:
+            active.add(objid)
+            sub = hashlib.sha256()
+            _hash_object(obj.resolve(), sub, memo, active)
+            active.discard(objid)
+            memo[objid] = sub.digest()
+            digest.update(memo[objid])
+    elif isinstance(obj, PDFStream):
+        digest.update(b"s")
+        _hash_object(obj.attrs, digest, memo, active)
+        data = obj.get_data()
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    elif isinstance(obj, dict):
+        digest.update(b"d")
+        for key in sorted(obj, key=str):
+            digest.update(str(key).encode("utf-8", "replace") + b"\0")
+            _hash_object(obj[key], digest, memo, active)
+        digest.update(b"e")
+    elif isinstance(obj, (list, tuple)):
+        digest.update(b"l")
+        for item in obj:
+            _hash_object(item, digest, memo, active)
+        digest.update(b"e")
+    elif isinstance(obj, bytes):
+        digest.update(b"b" + len(obj).to_bytes(8, "big") + obj)
+    elif isinstance(obj, (PSLiteral, PSKeyword)):
+        digest.update(b"n" + str(obj.name).encode("utf-8", "replace") + b"\0")
+    else:
+        digest.update(b"v" + repr(obj).encode("utf-8", "replace") + b"\0")
+
+def fingerprint_page(page, memo=None):
+    """
+    Calcula la huella de una página a partir de sus content streams, sus
+    recursos (XObjects, fuentes, imágenes...) y su geometría
+    
+    Dos versiones de un documento comparten huella en las páginas que no
+    han cambiado, aunque se hayan insertado o eliminado otras páginas. Si un
+    recurso compartido cambia (p. ej. el subconjunto de una fuente), todas
+    las páginas que lo usan se consideran modificadas.
+    
+    Args:
+        page (pdfplumber.page.Page): Página a procesar
+        memo (dict, optional): Hashes de objetos ya procesados en el mismo
+            documento, para no repetir el trabajo en cada página
+        
+    Returns:
+        str: Hash SHA-256 en hexadecimal
+    """
+    if memo is None:
+        memo = {}
+    page_obj = page.page_obj
+    digest = hashlib.sha256()
+    _hash_object(list(page_obj.contents or []), digest, memo, set())
+    _hash_object(page_obj.resources or {}, digest, memo, set())
+    _hash_object([page_obj.mediabox, page_obj.cropbox, page_obj.rotate], digest, memo, set())
+    return digest.hexdigest()
+
+def _table_to_markdown(rows):
+    """Convierte las filas de una tabla extraída en una tabla Markdown compacta"""
+    def clean(cell):
+        return " ".join((cell or "").split()).replace("|", "\\|")
+    
+    rows = [[clean(cell) for cell in row] for row in rows if any(row)]
+    if not rows:
+        return ""
+    
+    width = max(len(row) for row in rows)
+    rows = [row + [""] * (width - len(row)) for row in rows]
+    lines = ["| " + " | ".join(rows[0]) + " |", "|" + " --- |" * width]
+    lines += ["| " + " | ".join(row) + " |" for row in rows[1:]]
+    return "\n".join(lines)
+
+def extract_page_tables(page):
+    """
+    Extrae el texto de una página separando las tablas en bloques Markdown
+    
+    La detección de tablas usa la estrategia por líneas de pdfplumber, así
+    que en páginas sin líneas ni rectángulos no puede encontrar ninguna y
+    se omite: los documentos solo de prosa no pagan coste adicional.
+    
+    Args:
+        page (pdfplumber.page.Page): Página a procesar
+        
+    Returns:
+        tuple: (texto de la página, número de tablas detectadas)
+    """
+    if not (page.lines or page.rects):
+        return page.extract_text() or "", 0
+    
+    tables = page.find_tables()
+    if not tables:
+        return page.extract_text() or "", 0
+    
+    # El texto corrido excluye los caracteres que caen dentro de una tabla
+    bboxes = [table.bbox for table in tables]
+    
+    def outside_tables(obj):
+        if obj.get("object_type") != "char":
+            return True
+        x = (obj["x0"] + obj["x1"]) / 2
+        y = (obj["top"] + obj["bottom"]) / 2
+        return not any(x0 <= x <= x1 and top <= y <= bottom for x0, top, x1, bottom in bboxes)
+    
+    blocks = [page.filter(outside_tables).extract_text() or ""]
+    for index, table in enumerate(tables, 1):
+        markdown = _table_to_markdown(table.extract())
+        if markdown:
+            blocks.append(f"[Tabla {index}]\n{markdown}")
+    
+    return "\n\n".join(block for block in blocks if block), len(tables)
+
+def extract_pages(pdf_path, known_fingerprints=None, tables=False):
+    """
+    Extrae el texto página a página, saltando las páginas ya conocidas
+    
+    Args:
+        pdf_path (str): Ruta al archivo PDF
+        known_fingerprints (iterable, optional): Huellas de páginas ya
+            extraídas en una versión anterior del documento
+        tables (bool): Emitir las tablas como bloques Markdown en lugar de
+            aplanarlas en el texto
+        
+    Returns:
+        list: Un dict por página con "page", "fingerprint", "changed",
+            "text" (None en las páginas que no han cambiado), "tables" y
+            "elapsed_ms" con el tiempo de extracción de la página
+    """
+    known = set(known_fingerprints or ())
+    pages = []
+    
+    memo = {}
+    with pdfplumber.open(pdf_path) as pdf:
+        for page_num, page in enumerate(pdf.pages, 1):
+            started = time.perf_counter()
+            fingerprint = fingerprint_page(page, memo)
+            changed = fingerprint not in known
+            
+            text, table_count = None, 0
+            if changed and tables:
+                text, table_count = extract_page_tables(page)
+            elif changed:
+                text = page.extract_text() or ""
+            
+            pages.append({
+                "page": page_num,
+                "fingerprint": fingerprint,
+                "changed": changed,
+                "text": text,
+                "tables": table_count,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+            })
+    
+    return pages
+
+def join_pages(pages):
+    """Une el texto de las páginas con los marcadores de página habituales"""
+    text_content = ""
+    for page in pages:
+        if page.get("text"):
+            text_content += f"\n--- Página {page['page']} ---\n"
+            text_content += page["text"] + "\n"
+    return text_content.strip()
+
+def _cache_key(fingerprint, tables):
+    """Clave de la caché de páginas; el modo tablas produce otro texto"""
+    return f"tables:{fingerprint}" if tables else fingerprint
+
+def extract_text_from_pdf(pdf_path, page_cache=None, tables=False):
     """
     Extrae texto de un archivo PDF usando pdfplumber
     
     Args:
         pdf_path (str): Ruta al archivo PDF
+        page_cache (dict, optional): Páginas ya extraídas ({"text", "tables"})
+            indexadas por huella y modo. Solo se extraen las páginas que no
+            estén en la caché, y esta se actualiza con las nuevas.
+        tables (bool): Emitir las tablas como bloques Markdown
         
     Returns:
         dict: Resultado con texto extraído o error
@@ -27,19 +217,26 @@ def extract_text_from_pdf(pdf_path):
                 "error": f"File not found: {pdf_path}"
             }
         
-        # Extraer texto usando pdfplumber
-        text_content = ""
-        
-        with pdfplumber.open(pdf_path) as pdf:
-            # Extraer texto de todas las páginas
-            for page_num, page in enumerate(pdf.pages, 1):
-                page_text = page.extract_text()
-                if page_text:
-                    text_content += f"\n--- Página {page_num} ---\n"
-                    text_content += page_text + "\n"
+        # Extraer texto usando pdfplumber, reutilizando las páginas conocidas
+        if page_cache is None:
+            page_cache = {}
+        prefix = _cache_key("", tables)
+        known = [key[len(prefix):] for key in page_cache if key.startswith(prefix)]
+        pages = extract_pages(pdf_path, known, tables)
+        for page in pages:
+            key = _cache_key(page["fingerprint"], tables)
+            if page["changed"]:
+                page_cache[key] = {"text": page["text"], "tables": page["tables"]}
+            else:
+                cached = page_cache[key]
+                # Las cachés antiguas guardaban solo el texto
+                if isinstance(cached, str):
+                    cached = {"text": cached, "tables": 0}
+                page["text"] = cached["text"]
+                page["tables"] = cached["tables"]
         
         # Limpiar y validar el texto extraído
-        text_content = text_content.strip()
+        text_content = join_pages(pages)
         
         if not text_content or len(text_content) < 10:
             return {
@@ -50,7 +247,17 @@ def extract_text_from_pdf(pdf_path):
         return {
             "success": True,
             "text": text_content,
-            "length": len(text_content)
+            "length": len(text_content),
+            "pages": [
+                {
+                    "page": p["page"],
+                    "fingerprint": p["fingerprint"],
+                    "changed": p["changed"],
+                    "tables": p["tables"],
+                    "elapsed_ms": p["elapsed_ms"]
+                }
+                for p in pages
+            ]
         }
         
     except Exception as e:
@@ -61,15 +268,38 @@ def extract_text_from_pdf(pdf_path):
 
 def main():
     """Función principal para uso desde línea de comandos"""
-    if len(sys.argv) != 2:
+    args = sys.argv[1:]
+    cache_path = None
+    tables = False
+    if "--tables" in args:
+        args.remove("--tables")
+        tables = True
+    if len(args) == 3 and args[1] == "--cache":
+        cache_path = Path(args[2])
+        args = args[:1]
+    
+    if len(args) != 1:
         print(json.dumps({
             "success": False,
-            "error": "Usage: python pdf_extractor.py <pdf_file_path>"
+            "error": "Usage: python pdf_extractor.py <pdf_file_path> [--tables] [--cache <cache.json>]"
         }))
         sys.exit(1)
     
-    pdf_path = sys.argv[1]
-    result = extract_text_from_pdf(pdf_path)
+    # La caché guarda el texto de cada página por huella y modo, de modo que una
+    # nueva versión del mismo documento solo extrae las páginas modificadas
+    page_cache = {}
+    if cache_path and cache_path.exists():
+        try:
+            page_cache = json.loads(cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            page_cache = {}
+    
+    pdf_path = args[0]
+    result = extract_text_from_pdf(pdf_path, page_cache, tables)
+    
+    if cache_path and result["success"]:
+        cache_path.write_text(json.dumps(page_cache, ensure_ascii=False), encoding="utf-8")
+    
     print(json.dumps(result, ensure_ascii=False, indent=2))
 
 if __name__ == "__main__":